@@ -53,7 +53,7 @@ def build_matches_st(avg_colour_list_u16 : np.ndarray[np.uint16], sum_avg_sq : n
 #main matching (build_match_list_1d/2d run only once, process_matches_2d has to run every new mosaic to generate new random matches)
 @numba.jit(nopython=True, parallel=True, nogil=True, cache=True, fastmath=True)
 def build_matches_mt_1d(avg_colour_list_u16 : np.ndarray[np.uint16], sum_avg_sq : np.ndarray[np.uint64], 
-                        source_blocks : np.ndarray[np.uint8], cpu_count : int):
+                        source_blocks : np.ndarray[np.uint8], cpu_count : int, out : np.ndarray[np.int32] = None):
     """
         matches all source rgb values to their closest match in avg_colour_list_u16
 
@@ -62,19 +62,26 @@ def build_matches_mt_1d(avg_colour_list_u16 : np.ndarray[np.uint16], sum_avg_sq
         sum_avg_sq: array of (r1^2+g1^2+b1^2) for every single tile
         source_blocks: 2d(!) array of rgb values from the source media that needs to be converted
         cpu_count: no. of threads to use for the processing
+        out: (optional) preallocated array of len(source_blocks) to write the matches into
        
-        Returns:
-        converted version of source_blocks where all rgb values are replaced with indices into avg_colour_list_u16
+        Returns a tuple:
+        first value: converted version of source_blocks where all rgb values are replaced with indices into avg_colour_list_u16
+        second value: sorted array of the unique tile indices used in the converted array
+        third value: the largest tile index in the converted array
+        (the last two are tracked while matching to save extra passes over the converted array)
     """
+    if out is None:
+        out = np.empty(len(source_blocks), dtype=np.int32)
     s_len = int(np.ceil(len(source_blocks) / cpu_count))
-    segmented_match_list = np.zeros((cpu_count, s_len), dtype=np.int32)
+    segmented_max = np.zeros(cpu_count, dtype=np.int32)
+    unique_mask = np.zeros(len(avg_colour_list_u16), dtype=np.bool_)
     cmap = np.zeros(2**24, dtype=np.int32)
     cmap.fill(-1)
     
     for i in numba.prange(cpu_count):
         distances = np.zeros(len(avg_colour_list_u16))
         subslice = source_blocks[i*s_len : (i+1)*s_len]
-        submatch_list = np.zeros(s_len, dtype=np.int32)
+        max_idx = 0
         
         for j, colour in enumerate(subslice):
             sr, sg, sb = colour
@@ -85,14 +92,19 @@ def build_matches_mt_1d(avg_colour_list_u16 : np.ndarray[np.uint16], sum_avg_sq
                     ar, ag, ab = avg_colour
                     distances[k] = sum_avg_sq[k] - 2*(ar*sr + ag*sg + ab*sb)
                 cmap[key] = tile_idx = np.argmin(distances)
-            submatch_list[j] = tile_idx
-        segmented_match_list[i] = submatch_list
+                #every index that ends up in the output was a cache miss for at least one thread
+                #so only the misses need to be tracked to get the unique tiles and the max
+                unique_mask[tile_idx] = 1
+                if tile_idx > max_idx: max_idx = tile_idx
+            out[i*s_len + j] = tile_idx
+        segmented_max[i] = max_idx
         
-    return segmented_match_list.reshape(-1)
+    return out, np.nonzero(unique_mask)[0].astype(np.int32), int(segmented_max.max())
 
 @numba.jit(nopython=True, parallel=True, nogil=True, cache=True, fastmath=True)
 def build_matches_mt_2d(avg_colour_list_u16 : np.ndarray[np.uint16], sum_avg_sq : np.ndarray[np.uint64], 
-                        source_blocks : np.ndarray[np.uint8], cpu_count : int, random_choice : int):
+                        source_blocks : np.ndarray[np.uint8], cpu_count : int, random_choice : int, 
+                        out : np.ndarray[np.ndarray[np.int32]] = None):
     """
         matches all source rgb values to len(random_choice) number of closest matches in avg_colour_list_u16  
         
@@ -106,20 +118,24 @@ def build_matches_mt_2d(avg_colour_list_u16 : np.ndarray[np.uint16], sum_avg_sq
          source_blocks: 2d(!) array of rgb values from the source media that needs to be converted
          cpu_count: no. of threads to use for the processing
          random_choice: how many tile indices to save for a different colour
+         out: (optional) preallocated array of shape (len(source_blocks), random_choice) to write the matches into
        
-        Returns:
-         converted version of source_blocks where all rgb values with an array of len(random_choice)
+        Returns a tuple:
+         first value: converted version of source_blocks where all rgb values with an array of len(random_choice)
          that contains a selection of the closest sorted matches to that pixel 
+         second value: the largest tile index out of every possible match (upper bound for whichever one gets picked later)
     """
+    if out is None:
+        out = np.empty((len(source_blocks), random_choice), dtype=np.int32)
     s_len = int(np.ceil(len(source_blocks) / cpu_count))
-    segmented_match_list = np.zeros((cpu_count, s_len, random_choice), dtype=np.int32) 
+    segmented_max = np.zeros(cpu_count, dtype=np.int32)
     cmap = np.zeros((2**24, random_choice), dtype=np.int32)
     cmap.fill(-1)
     
     for i in numba.prange(cpu_count):
         distances = np.zeros(len(avg_colour_list_u16))
         subslice = source_blocks[i*s_len : (i+1)*s_len]
-        submatch_list = np.zeros((s_len, random_choice), np.int32) 
+        max_idx = 0
         
         for j, colour in enumerate(subslice):
             sr, sg, sb = colour
@@ -132,16 +148,18 @@ def build_matches_mt_2d(avg_colour_list_u16 : np.ndarray[np.uint16], sum_avg_sq
                     distances[k] = sum_avg_sq[k] - 2*(ar*sr + ag*sg + ab*sb)
                 parted = np.argpartition(distances, random_choice)[:random_choice] #get the smallest x values
                 cmap[key] = tile_idxs = parted[np.argsort(distances[parted])].astype(np.int32) #sorting shenanigans
+                max_idx = max(max_idx, tile_idxs.max())
                 
-            submatch_list[j] = tile_idxs
-        segmented_match_list[i] = submatch_list
+            out[i*s_len + j] = tile_idxs
+        segmented_max[i] = max_idx
     
-    return segmented_match_list.reshape(-1, random_choice)
+    return out, int(segmented_max.max())
 
 @numba.jit(nopython=True, nogil=True, cache=True)
-def process_matches_2d(match_arr : np.ndarray[np.ndarray[np.int32]], random_choice : int): 
+def process_matches_2d(match_arr : np.ndarray[np.ndarray[np.int32]], random_choice : int, tile_count : int): 
     """
         takes a 2d match_array and returns a 1d version where a random match is selected from each sub-array
+        along with a sorted array of the unique tile indices that were selected
         
         this is the second half of the dithering 'algorithm' used, 
         where in build_matches_mt_2d we select len(random_choice) number of closest matches  
@@ -152,8 +170,11 @@ def process_matches_2d(match_arr : np.ndarray[np.ndarray[np.int32]], random_choi
          match_arr: 2d array of tile indices, where each value is an array of len(random_choice) potential matches for that pixel
          random_choice: how many tile indices were selected for a different colour
          (can be different from how many are actually in the array to limit the selection to closer matches)
+         tile_count: anything larger than the biggest tile index in match_arr
     """
     fm_list = np.zeros(len(match_arr), dtype=np.int32)
+    unique_mask = np.zeros(tile_count, dtype=np.bool_)
     for i, match in enumerate(match_arr):
-        fm_list[i] = match[np.random.randint(0, random_choice) if random_choice else 0]
-    return fm_list
\ No newline at end of file
+        fm_list[i] = tile_idx = match[np.random.randint(0, random_choice) if random_choice else 0]
+        unique_mask[tile_idx] = 1
+    return fm_list, np.nonzero(unique_mask)[0].astype(np.int32)
\ No newline at end of file
@@ -23,7 +23,10 @@ class Renderer(ui.base.Component):
         #read only references to the main mosaic
         self.source = PySaic.mosaic.source
         self.tiles = PySaic.mosaic.tiles
-        self.unique_tiles = PySaic.mosaic.unique_tiles
+        #the streamer wants a set, converting once here saves it a unique pass on every stream call
+        #(vid mode is already a set and has to stay the same object since the source keeps adding to it)
+        unique_tiles = PySaic.mosaic.unique_tiles
+        self.unique_tiles = unique_tiles if isinstance(unique_tiles, set) else set(unique_tiles.tolist())
 
         #mosaic metadata
         if PySaic.mosaic.mode == "vid": 
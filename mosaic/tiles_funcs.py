@@ -27,4 +27,39 @@ def rgb_mean(rgb_array: np.ndarray[np.ndarray[np.uint8]]):
         for colour in row:
             rgb += colour
             iters += 1
-    return rgb / iters
\ No newline at end of file
+    return rgb / iters
+
+@numba.jit(nopython=True, nogil=True, cache=True)
+def _key_bucket(key, bucket_count):
+    return (np.int64(key) * bucket_count) >> 24
+
+@numba.jit(nopython=True, nogil=True, cache=True, parallel=True)
+def first_unique(keys : np.ndarray[np.int32], bucket_count : int) -> np.ndarray[np.bool_]:
+    """returns a mask of which keys are the first occurence of their value in keys (keys have to be 24 bit rgb colour keys)
+    \nthe keys are partitioned once by their high bits (counting sort, keeps the original order inside each bucket)
+    and then every thread only sorts and scans its own bucket, so no two threads ever touch the same key"""
+    #pass 1 -> bucket sizes and where each bucket starts
+    starts = np.zeros(bucket_count+1, dtype=np.int64)
+    for i in range(len(keys)):
+        starts[_key_bucket(keys[i], bucket_count) + 1] += 1
+    starts = np.cumsum(starts)
+
+    #pass 2 -> scatter the indices into their buckets, in order
+    order = np.empty(len(keys), dtype=np.int64)
+    fill = starts[:-1].copy()
+    for i in range(len(keys)):
+        bucket = _key_bucket(keys[i], bucket_count)
+        order[fill[bucket]] = i
+        fill[bucket] += 1
+
+    #pass 3 -> stable sort each bucket, the first of every run of equal keys is its first occurence
+    keep = np.zeros(len(keys), dtype=np.bool_)
+    for bucket in numba.prange(bucket_count):
+        idxs = order[starts[bucket]:starts[bucket+1]]
+        bucket_keys = keys[idxs]
+        prev = -1
+        for j in np.argsort(bucket_keys, kind="mergesort"):
+            if bucket_keys[j] != prev:
+                prev = bucket_keys[j]
+                keep[idxs[j]] = True
+    return keep
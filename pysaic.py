@@ -51,7 +51,8 @@ class Mosaic:
         #set after matching
         self.raw_matches : np.ndarray[int] | np.ndarray[np.ndarray[int]] = None #1d array of rgb values converted to list of tile indices (2d in case dithering is enabled)
         self.matches : np.ndarray[int] = None #same as m_list but always 1 dimensional (dithered choices are flattened)
-        self.unique_tiles : set = None #set of all unique tiles used in the mosaic, used for the renderers
+        self.max_match : int = None #largest tile index in raw_matches, used to size the rendering maps
+        self.unique_tiles : np.ndarray[int] | set = None #sorted array of all unique tiles used in the mosaic (set in vid mode since it grows while streaming), used for the renderers
 
         #set for rendering
         self.tile_map : np.ndarray[int] = None
@@ -78,17 +79,29 @@ class Mosaic:
         self.vid_tiles : list[str] = [] #path to all video tiles
 
         self.rand_choice : int = 0 #dithering level
+
+    @property
+    def source_path(self) -> str:
+        return self._source_path
+
+    @source_path.setter
+    def source_path(self, value : str):
+        #the home screen checks the extension on every ui event, so work it out once whenever the path changes
+        self._source_path = value
+        ext = value.rpartition(".")[2] if value else None #ExtensionSet handles the casing, same as every other extension check
+        self._is_vid = ext is not None and ext in PySaic.vid_extensions
+        self._is_pic = ext is not None and ext in PySaic.pic_extensions
     
     def clone(self, orig):
         """copies over all user setting variables from one mosaic metadata object to the other"""
         for field, value in orig.__dict__.items():
-            if field in ("mode", "source_path", "source_scale", "tile_folder", "enable_pics", 
+            if field in ("mode", "_source_path", "_is_vid", "_is_pic", "source_scale", "tile_folder", "enable_pics", 
                          "enable_vids", "pic_tiles", "vid_tiles", "rand_choice"):
                 self.__dict__[field] = value
     
     def __eq__(self, value):
         for field, value in value.__dict__.items():
-            if field in ("mode", "source_path", "source_scale", "tile_folder", "enable_pics", 
+            if field in ("mode", "_source_path", "_is_vid", "_is_pic", "source_scale", "tile_folder", "enable_pics", 
                          "enable_vids", "pic_tiles", "vid_tiles", "rand_choice"):
                 if not self.__dict__[field] == value:
                     return False
@@ -67,19 +67,18 @@ class Main(Stage):
             self.ui_tiles.queue_del_component("vids")
         
         #right - when to ask for media location - no media, invalid vid, invalid photo
-        ext = PySaic.temp.source_path.split(".")[-1] if PySaic.temp.source_path else None
         if "choose" not in self.ui_source:
             if not PySaic.temp.source_path \
-            or (new_mode == "vid" and ext not in PySaic.vid_extensions) \
-            or (new_mode != "vid" and ext not in PySaic.pic_extensions):
+            or (new_mode == "vid" and not PySaic.temp._is_vid) \
+            or (new_mode != "vid" and not PySaic.temp._is_pic):
                 if PySaic.temp.source_path in self.ui_source: self.ui_source.queue_del_component(PySaic.temp.source_path)
                 self.ui_source.add_components({"choose" : ui.components.TileButton(UII, "assets/tiles/source.png", (325, 75), "Choose media", 24,
                                                         click_func=self.clickon_media)}) 
         
         #when to respawn the chosen media preview - switch from mode where media was invalid to mode where media is valid
         if PySaic.temp.source_path not in self.ui_source and PySaic.temp.source_path:     
-            if (new_mode == "vid" and ext in PySaic.vid_extensions) \
-            or (new_mode != "vid" and ext in PySaic.pic_extensions):
+            if (new_mode == "vid" and PySaic.temp._is_vid) \
+            or (new_mode != "vid" and PySaic.temp._is_pic):
                 if "choose" in self.ui_source: self.ui_source.queue_del_component("choose")
                 self.ui_source.add_components({PySaic.temp.source_path : ui.components.PaneButton(UII, PySaic.temp.source_path, (325, 75), "CHANGE MEDIA", 24,
                                                                     click_func=self.clickon_media)}) 
@@ -115,16 +114,32 @@ class Main(Stage):
         def scan_folder(parent_folder):
             pic_tiles = []
             vid_tiles = []
+            #looked up once here instead of for every single file (adds up on folders with 100k+ files)
+            add_pic, add_vid = pic_tiles.append, vid_tiles.append
+            pic_exts, vid_exts = PySaic.pic_extensions, PySaic.vid_extensions
             print("Scanning folder...")
-            for folder, _, files in tqdm((os.walk(parent_folder))):
-                for file in files:
+            folders = [parent_folder]
+            with tqdm() as pbar:
+                while folders:
+                    #only checked per folder, still cancels near instantly but keeps the per file loop tight
                     if PySaic.stop_loading_flag:
                         util.misc.log("User cancelled folder scan.")
                         return
-                    if file.split(".")[-1] in PySaic.pic_extensions:
-                        pic_tiles.append(f"{folder}\\{file}")
-                    elif file.split(".")[-1] in PySaic.vid_extensions:
-                        vid_tiles.append(f"{folder}\\{file}")
+                    try:
+                        entries = os.scandir(folders.pop())
+                    except OSError: #same as os.walk, skip folders we can't open
+                        continue
+                    with entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                folders.append(entry.path)
+                                continue
+                            ext = entry.name.rpartition(".")[2]
+                            if ext in pic_exts:
+                                add_pic(entry.path)
+                            elif ext in vid_exts:
+                                add_vid(entry.path)
+                    pbar.update(1)
             return(parent_folder, pic_tiles, vid_tiles)
         
         def returnfrom_scanfolder(self):
@@ -167,7 +182,7 @@ class Main(Stage):
         """user clicks on 'change media' if media has been loaded in / 'choose media' if it hasn't (both lead here)"""
         if not (media := askopenfilename()) or media == PySaic.temp.source_path:
             return
-        ext = media.split(".")[-1]
+        ext = media.rpartition(".")[2]
         if (PySaic.temp.mode == "vid" and ext not in PySaic.vid_extensions) or \
            (PySaic.temp.mode != "vid" and ext not in PySaic.pic_extensions):
             UII.toast(f"Not a valid {'video' if PySaic.temp.mode == 'vid' else 'picture'}!")
@@ -187,7 +202,6 @@ class Main(Stage):
     def clickon_go(self):
         """user clicks on 'go'
         \n performs the necessary validation to check that the program can proceed"""
-        ext  = PySaic.temp.source_path.split(".")[-1] if PySaic.temp.source_path else None
         if not PySaic.temp.tile_folder:
             UII.toast("Please choose a valid tile folder!")
             assert not self.ui_source["go"].is_toggled
@@ -198,8 +212,8 @@ class Main(Stage):
             assert not self.ui_source["go"].is_toggled
             return
         if not PySaic.temp.source_path \
-        or (ext not in PySaic.vid_extensions and PySaic.temp.mode == "vid") \
-        or (ext not in PySaic.pic_extensions and PySaic.temp.mode != "vid"):
+        or (not PySaic.temp._is_vid and PySaic.temp.mode == "vid") \
+        or (not PySaic.temp._is_pic and PySaic.temp.mode != "vid"):
             UII.toast(f"Please choose a valid {'video' if PySaic.temp.mode == 'vid' else 'picture'}!")
             assert not self.ui_source["go"].is_toggled
             return
@@ -9,8 +9,11 @@ from pysaic import PySaic, Stage
 import util.misc
 import mosaic.source
 import mosaic.tiles
+import mosaic.tiles_funcs
 import mosaic.match
 
+FILTER_MT_THRESHOLD = 50000 #no. of tiles above which filtering duplicate colours is split across all cores
+
 #mosaic processing stage (does not draw any UI elements to the stage)
 #serves as the bridge between stage_main and stage_render
 #the metadata is processed into a valid mosaic and stored in PySaic.mosaic
@@ -32,14 +35,13 @@ class Mosaic(Stage):
                 return result 
             
     def filter_tiles(self, tiles : list[mosaic.tiles.Tile]) -> list[mosaic.tiles.Tile]:
-        """filters out tiles that have the same colour"""
-        tile_set = set()
-        filtered_tiles = []
-        for tile in tiles:
-            if tile.colour_key in tile_set:
-                continue
-            tile_set.add(tile.colour_key)
-            filtered_tiles.append(tile)
+        """filters out tiles that have the same colour (keeps the first tile of every colour)"""
+        keys = np.fromiter((tile.colour_key for tile in tiles), dtype=np.int32, count=len(tiles))
+        if len(tiles) > FILTER_MT_THRESHOLD:
+            keep = np.flatnonzero(mosaic.tiles_funcs.first_unique(keys, os.cpu_count()))
+        else:
+            keep = np.sort(np.unique(keys, return_index=True)[1]) #indices of first occurences, sorted back into the original order
+        filtered_tiles = [tiles[idx] for idx in keep]
         print(f"Filtered {((len(tiles) - len(filtered_tiles)) / len(tiles)) * 100:.2f}% of tiles.")
         return filtered_tiles
 
@@ -54,7 +56,7 @@ class Mosaic(Stage):
         # ///////////////////////////////// tiles ///////////////////////////
 
         tiles : list[mosaic.tiles.Tile] = []
-        unique_tiles : set[int] = None #set of unique tile indices used in the mosaic
+        unique_tiles : np.ndarray[np.int32] | set[int] = None #sorted unique tile indices used in the mosaic (set for video)
         #in the case of video, its added to dynamically as the video streams in
 
         #this is uint16 instead of uint8 because colours are multiplied together during matching
@@ -81,6 +83,7 @@ class Mosaic(Stage):
         #we add 'dithering' by finding len(PySaic.temp.rand_choice) number of closest matches  
         #and then randomly selecting one of those matches to display  
         raw_matches : np.ndarray[np.ndarray[np.int32]] | np.ndarray[np.int32] = None #random may be enabled
+        max_match : int = None #largest tile index that can show up in matches, tracked during matching
 
         # ///////////////////////// rendering /////////////////////////
 
@@ -168,19 +171,16 @@ class Mosaic(Stage):
             if PySaic.stop_loading_flag: return
 
             start = time.perf_counter()
+            #workers write straight into an array sized to the source so there's no padding to trim off afterwards
             if not PySaic.temp.rand_choice:
-                raw_matches = mosaic.match.build_matches_mt_1d(avg_colours, sum_avg_sq, source.blocks, os.cpu_count())
+                raw_matches, unique_tiles, max_match = mosaic.match.build_matches_mt_1d(avg_colours, sum_avg_sq, source.blocks, os.cpu_count(),
+                                                                          out=np.empty(source.blocks.shape[0], dtype=np.int32))
             else:
-                raw_matches = mosaic.match.build_matches_mt_2d(avg_colours, sum_avg_sq, source.blocks, os.cpu_count(), PySaic.temp.rand_choice)
+                raw_matches, max_match = mosaic.match.build_matches_mt_2d(avg_colours, sum_avg_sq, source.blocks, os.cpu_count(), PySaic.temp.rand_choice,
+                                                                          out=np.empty((source.blocks.shape[0], PySaic.temp.rand_choice), dtype=np.int32))
             print(f"done in {time.perf_counter() - start} seconds.")
         else:
-            raw_matches = PySaic.mosaic.raw_matches
-        
-        #the multithreaded matching process can add an arbitrary amount of zeroes to the end of the matched array
-        #this messes with the renderer so we cap it here
-        if PySaic.temp.mode != "vid" and raw_matches.shape[0] != source.blocks.shape[0]:
-            assert raw_matches.shape[0] > source.blocks.shape[0]
-            raw_matches = raw_matches[:source.blocks.shape[0]]
+            raw_matches, unique_tiles, max_match = PySaic.mosaic.raw_matches, PySaic.mosaic.unique_tiles, PySaic.mosaic.max_match
 
         if PySaic.stop_loading_flag: return
 
@@ -188,11 +188,10 @@ class Mosaic(Stage):
         if PySaic.temp.mode != "vid":
             print(f"Processing {len(raw_matches)} matches... ", end="")
             start = time.perf_counter()
-            if np.isscalar(raw_matches[0]):
-                matches = raw_matches
+            if raw_matches.ndim == 1:
+                matches = raw_matches #unique tiles were already collected during matching
             else:
-                matches = mosaic.match.process_matches_2d(raw_matches, PySaic.temp.rand_choice)
-            unique_tiles = set(matches)
+                matches, unique_tiles = mosaic.match.process_matches_2d(raw_matches, PySaic.temp.rand_choice, max_match+1)
             if PySaic.stop_loading_flag: return
             print(f"done in {time.perf_counter() - start} seconds.")
         else:
@@ -205,28 +204,27 @@ class Mosaic(Stage):
         print("Generating rendering maps...", end="")
         start = time.perf_counter()
         streamable = unique_tiles if PySaic.temp.mode != "vid" else range(len(tiles))
-        map_size = np.max(matches)+1 if PySaic.temp.mode != "vid" else len(tiles)
+        map_size = max_match+1 if matches is not None else len(tiles)
 
         tile_map = np.zeros(map_size, dtype=np.int32) #index: id from matches -> new id with no gaps
         tile_len_map = np.zeros(map_size, dtype=np.int32) #index: id from matches -> how many frames in tile 
         
-        tile_lens = [tiles[tile_idx].len for tile_idx in streamable]
-        mean_tile_len = int(np.mean(tile_lens))
+        streamable_idxs = np.fromiter(streamable, dtype=np.int32, count=len(streamable))
+        tile_lens = np.fromiter((tiles[tile_idx].len for tile_idx in streamable_idxs), dtype=np.int32, count=len(streamable_idxs))
+        mean_tile_len = int(tile_lens.mean())
         if PySaic.temp.mode == "hyb":
             if PySaic.settings.CAP_TILE_LENGTHS:
                 max_tile_len = mean_tile_len
             else:
-                max_tile_len = max(tile_lens)
+                max_tile_len = int(tile_lens.max())
         else:
             max_tile_len = 1
     
-        offset = 0
-        for tile_idx in streamable: 
-            tile_map[tile_idx] = offset
-            frame_count = min(tiles[tile_idx].len, max_tile_len)
-            tile_len_map[tile_idx] = frame_count
-            offset += frame_count
-        total_frames = offset
+        #each tile gets packed in right after the one before it, so its offset is the running total of every frame count before it
+        frame_counts = np.minimum(tile_lens, max_tile_len)
+        tile_map[streamable_idxs] = np.cumsum(frame_counts) - frame_counts
+        tile_len_map[streamable_idxs] = frame_counts
+        total_frames = int(frame_counts.sum())
         print(f"done in {time.perf_counter() - start} seconds.")
 
         #step 6 -> commit to global mosaic vars 
@@ -238,6 +236,7 @@ class Mosaic(Stage):
         PySaic.mosaic.colours, PySaic.mosaic.clr_sq_sum = avg_colours, sum_avg_sq
         
         PySaic.mosaic.raw_matches, PySaic.mosaic.matches = raw_matches, matches
+        PySaic.mosaic.max_match = max_match
         PySaic.mosaic.tile_map, PySaic.mosaic.tile_len_map = tile_map, tile_len_map
         PySaic.mosaic.mean_tile_len, PySaic.mosaic.max_tile_len = mean_tile_len, max_tile_len
         PySaic.mosaic.total_frames = total_frames
@@ -11,90 +11,111 @@ import ui.util.wrappers
 #user facing wrapper for the renderer, handles all controls
 #(except for click and drag)
 
+#held keys are tracked as a bitmask, with the pan direction for every combination of wasd precalculated
+K_DIR_BITS = {pygame.K_d : 1, pygame.K_a : 2, pygame.K_s : 4, pygame.K_w : 8, pygame.K_UP : 16, pygame.K_DOWN : 32}
+_PAN_LUT = tuple(((mask & 1) - (mask >> 1 & 1), (mask >> 2 & 1) - (mask >> 3 & 1)) for mask in range(16))
+_ZOOM_LUT = (0, 1, -1, 0) #up, down bits
+
 class Render(Stage):
     def start(self):
         self.ui = dict()
-        self.ui["renderer"] = mosaic.render_classes.Renderer(PySaic.UI)
+        self.ui["renderer"] = renderer = mosaic.render_classes.Renderer(PySaic.UI)
         self.stock_fps = PySaic.fps
-        self.ui["renderer"].is_playing = PySaic.mosaic.mode != "pic"
-        self.held_keys = set()
+        renderer.is_playing = PySaic.mosaic.mode != "pic"
+        self._dir_mask = 0
+
+        #key -> handler, so each key press is one dict lookup instead of a chain of ifs
+        #handlers return True if the stage was switched and the rest of the update should be skipped
+        self._keydown_handlers = {
+            pygame.K_SPACE : self._toggle_play,
+            pygame.K_r : self._debug_render,
+            pygame.K_e : self._toggle_debug_streaming,
+            pygame.K_q : self._random_seek,
+            pygame.K_ESCAPE : self._exit_render,
+            pygame.K_COMMA : self._step_frame,
+            pygame.K_PERIOD : self._step_frame
+        }
         
         PySaic.UI.add(self.ui)
-        PySaic.change_fps(self.ui["renderer"].fps)
+        PySaic.change_fps(renderer.fps)
 
-    def update(self, events):
-        for event in events:
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button > 3: #scroll wheel
-                zoom_delta = 4 if event.button == 4 else -4
-                self.ui["renderer"].change_zoom(zoom_delta)
+    def _toggle_play(self, event):
+        renderer = self.ui["renderer"]
+        renderer.is_playing = not renderer.is_playing
+        if renderer.is_playing:
+            PySaic.change_fps(renderer.fps)
+        else:
+            PySaic.change_fps(self.stock_fps)
+
+    def _debug_render(self, event):
+        self.ui["renderer"].debug_render()
+
+    def _toggle_debug_streaming(self, event):
+        renderer = self.ui["renderer"]
+        renderer.debug_streaming = not renderer.debug_streaming
+
+    def _random_seek(self, event):
+        self.ui["renderer"].change_pos(random.randrange(0, PySaic.mosaic.source.frame_count))
+
+    def _exit_render(self, event): #pause rendering if user wants to change modes/media
+        self.ui["renderer"].is_playing = False
+        PySaic.change_fps(self.stock_fps)
+        PySaic.transfer_stage("main")
 
+    def _step_frame(self, event): #youtube style frame by frame seeking with , .
+        renderer = self.ui["renderer"]
+        if renderer.is_playing:
+            return
+        frame_idx = renderer.frame_pos + (1 if event.key == pygame.K_PERIOD else -1)
+        try:    
+            renderer.change_pos(frame_idx)
+        except ui.util.exceptions.UIMediaException:
+            PySaic.UI.toast("Error seeking in video!")
+            PySaic.switch_stage("main")
+            return True
+
+    def update(self, events):
+        renderer = self.ui["renderer"]
+        for event in events: #already drained once per frame by the main loop
             if event.type == pygame.KEYDOWN: #handle key presses
-                if event.key in (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_UP, pygame.K_DOWN):
-                    self.held_keys.add(event.key) #wasd up down
-
-                if event.key == pygame.K_SPACE: #space bar
-                    self.ui["renderer"].is_playing = not self.ui["renderer"].is_playing
-                    if self.ui["renderer"].is_playing:
-                        PySaic.change_fps(self.ui["renderer"].fps)
-                    else:
-                        PySaic.change_fps(self.stock_fps)
-                
-                if event.key == pygame.K_r:
-                    self.ui["renderer"].debug_render()
-                
-                if event.key == pygame.K_e:
-                    self.ui["renderer"].debug_streaming = not self.ui["renderer"].debug_streaming
-                
-                if event.key == pygame.K_q:
-                    self.ui["renderer"].change_pos(random.randrange(0, PySaic.mosaic.source.frame_count))
-
-                if event.key == pygame.K_ESCAPE: #pause rendering if user wants to change modes/media
-                    self.ui["renderer"].is_playing = False
-                    PySaic.change_fps(self.stock_fps)
-                    PySaic.transfer_stage("main")
-
-                if not self.ui["renderer"].is_playing and event.key in (pygame.K_COMMA, pygame.K_PERIOD):
-                    frame_idx = 0 #youtube style frame by frame seeking with , .
-                    if event.key == pygame.K_PERIOD:
-                        frame_idx = self.ui["renderer"].frame_pos + 1
-                    elif event.key == pygame.K_COMMA:    
-                        frame_idx = self.ui["renderer"].frame_pos - 1
-                    try:    
-                        self.ui["renderer"].change_pos(frame_idx)
-                    except ui.util.exceptions.UIMediaException:
-                        PySaic.UI.toast("Error seeking in video!")
-                        PySaic.switch_stage("main")
-                        return
-            
-            if event.type == pygame.KEYUP:
-                if event.key in (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_UP, pygame.K_DOWN):
-                    self.held_keys.discard(event.key)
+                self._dir_mask |= K_DIR_BITS.get(event.key, 0) #wasd up down
+                handler = self._keydown_handlers.get(event.key)
+                if handler and handler(event):
+                    return
+
+            elif event.type == pygame.KEYUP:
+                self._dir_mask &= ~K_DIR_BITS.get(event.key, 0)
 
-        if self.ui["renderer"].is_playing:
+            elif event.type == pygame.MOUSEWHEEL and event.y: #scroll wheel (vertical only)
+                renderer.change_zoom(event.y * 4)
+
+        if renderer.is_playing:
             try:
-                self.ui["renderer"].change_pos(self.ui["renderer"].frame_pos + 1)
+                renderer.change_pos(renderer.frame_pos + 1)
             except ui.util.exceptions.UIMediaException:
                 PySaic.UI.toast("Error seeking in video!")
                 PySaic.switch_stage("main")
                 return
         
-        delta = max(16 // self.ui["renderer"].tile_size, 1)
-        jump = [0,0]
-        jump[0] += delta*(pygame.K_d in self.held_keys) - delta*(pygame.K_a in self.held_keys)
-        jump[1] += delta*(pygame.K_s in self.held_keys) - delta*(pygame.K_w in self.held_keys)
-        if jump[0] or jump[1]:
-            self.ui["renderer"].pan(jump)
-
-        if pygame.K_DOWN in self.held_keys or pygame.K_UP in self.held_keys:
-            zoom_delta = 1*(pygame.K_UP in self.held_keys) - 1*(pygame.K_DOWN in self.held_keys)
-            self.ui["renderer"].change_zoom(zoom_delta)
+        if not self._dir_mask: #nothing to pan or zoom, keeps idle ticks (paused or pic mode) cheap
+            return
+
+        dx, dy = _PAN_LUT[self._dir_mask & 0xF]
+        if dx or dy:
+            delta = max(16 // renderer.tile_size, 1)
+            renderer.pan([dx*delta, dy*delta])
+
+        zoom_delta = _ZOOM_LUT[self._dir_mask >> 4]
+        if zoom_delta:
+            renderer.change_zoom(zoom_delta)
             
     def pause(self): #stop streaming anything if user hits ESCAPE
         self.ui["renderer"].sm.halt()
 
     def resume(self): #restart streaming if user changes nothing after hitting ESCAPE and returning
-        if self.ui["renderer"].tile_size == self.ui["renderer"].min_size:
-            self.ui["renderer"].sm.stream(self.ui["renderer"].unique_tiles, self.ui["renderer"].min_size, wait=True)
+        renderer = self.ui["renderer"]
+        if renderer.tile_size == renderer.min_size:
+            renderer.sm.stream(renderer.unique_tiles, renderer.min_size, wait=True)
 
     def cleanup(self): #user starts displaying another mosaic
         PySaic.change_fps(self.stock_fps)
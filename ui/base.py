@@ -1,9 +1,7 @@
 from typing import Literal, TYPE_CHECKING
-import gc
+import functools
 
 import pygame
-import numpy as np
-from bidict import bidict
 
 import ui.transform
 import ui.util.wrappers
@@ -13,8 +11,41 @@ if TYPE_CHECKING:
     from ui.core import UIInstance
 
 AlignType = Literal["topleft", "topmid", "topright", "midleft", "midmid", "midright", "botleft", "botmid", "botright"]
+#align -> (x, y) fraction of the surface that point sits at
+_ALIGN_FACTORS : dict[AlignType, tuple[float, float]] = {vert + horz : (0.5 * ("left", "mid", "right").index(horz), 0.5 * ("top", "mid", "bot").index(vert)) 
+                                                         for vert in ("top", "mid", "bot") for horz in ("left", "mid", "right")}
+
+#spare SRCALPHA surfaces by size, so layouts dont have to allocate (and zero) fresh ones every frame
+#released surfaces only go back in the pool on the next frame in case something still holds onto them for this one
+SURF_POOL_SIZES = 32 #max no. of different sizes to keep spares for
+_surf_pool : dict[tuple[int, int], list[pygame.Surface]] = {}
+_surf_released : list[pygame.Surface] = []
+
+def _acquire_surf(size):
+    """returns a cleared SRCALPHA surface of size, reusing a spare one if there is one"""
+    spares = _surf_pool.get(tuple(size))
+    if not spares:
+        return pygame.Surface(size, pygame.SRCALPHA)
+    surf = spares.pop()
+    surf.fill((0,0,0,0))
+    surf.set_alpha(255)
+    return surf
+
+def _release_surf(surf):
+    """hand a surface from _acquire_surf back once its not needed anymore"""
+    _surf_released.append(surf)
+
+def _surf_pool_next_frame():
+    """makes surfaces released last frame reusable, called once per frame by the root layout"""
+    for surf in _surf_released:
+        _surf_pool.setdefault(surf.size, []).append(surf)
+    _surf_released.clear()
+    while len(_surf_pool) > SURF_POOL_SIZES: #animations go through a lot of sizes, drop the oldest
+        del _surf_pool[next(iter(_surf_pool))]
 
 class Position:
+    __slots__ = ("align", "anchor", "offset", "_align_f", "_anchor_f")
+
     def __init__(self, align : AlignType, anchor : AlignType, xy = None):
         """where does this component go?
         align: which point on the component are we talking about?
@@ -22,35 +53,42 @@ class Position:
         xy: offset for that point"""
         self.align = align
         self.anchor = anchor
-        self.offset = list(xy) if xy is not None else [0,0]
+        self.offset = (xy[0], xy[1]) if xy is not None else (0, 0)
+        #look up the alignment fractions once so rendering doesnt have to do string lookups and numpy calls on 2 element arrays every frame
+        self._align_f = _ALIGN_FACTORS[align]
+        self._anchor_f = _ALIGN_FACTORS[anchor]
 
     def convert_align(self, surface_size, scale_xy):
         """returns the top left coordinate + offset of the surface"""
-        offset = np.multiply(self.offset, scale_xy)
-        adjusted = (surface_size[0] * 0.5 * ("left", "mid", "right").index(self.align[3:]), 
-                    surface_size[1] * 0.5 * ("top", "mid", "bot").index(self.align[:3]))
-        return np.subtract(offset, adjusted)
+        return (self.offset[0]*scale_xy[0] - surface_size[0]*self._align_f[0], 
+                self.offset[1]*scale_xy[1] - surface_size[1]*self._align_f[1])
     
     def convert_anchor(self, surface_size, parent_size, scale_xy):
         """returns the top left coordinate of the surface offset relative to its parent"""
-        top_left = self.convert_align(surface_size, scale_xy)
-        adjusted = (parent_size[0] * 0.5 * ("left", "mid", "right").index(self.anchor[3:]), 
-                    parent_size[1] * 0.5 * ("top", "mid", "bot").index(self.anchor[:3]))
-        return np.add(top_left, adjusted)
+        x, y = self.convert_align(surface_size, scale_xy)
+        return (x + parent_size[0]*self._anchor_f[0], y + parent_size[1]*self._anchor_f[1])
+
+#positions never change once made, so components placed the same way can share one
+_DEFAULT_POSITION = Position("midmid", "midmid")
+
+@functools.lru_cache(maxsize=256)
+def _make_position(align : AlignType, anchor : AlignType, offset : tuple):
+    return Position(align, anchor, offset)
 
 class Component:
     """any class inheriting from Component must override
     resize() and render()"""
-    def __eq__(self, value): #for when calling UIInstance.components.remove(component)
-        return value.debug_colourkey == self.debug_colourkey
-    def __hash__(self):
-        return self.debug_colourkey
+    #slots keep the base attributes out of a per instance __dict__ (inheritants still get one for their own attributes)
+    __slots__ = ("uii", "parent", "position", "transforms", 
+                 "click_func", "click_args", "hover_func", "hover_args", "force_gc", "max_transparency", "is_layout", 
+                 "is_clicked", "is_hovered", "is_alive", "debug_strings", "debug_colour", "debug_colourkey", 
+                 "_render_base", "_render_impl", "__weakref__")
 
     def __init__(self, ui_instance, **kwargs):
         #used to draw
         self.uii : 'UIInstance' = ui_instance
         self.parent : Layout = kwargs.get("parent", None)
-        self.position : Position = kwargs.get("position", Position("midmid", "midmid"))
+        self.position : Position = kwargs.get("position", _DEFAULT_POSITION)
         self.transforms : list[ui.transform.Transform] = []
 
         #set once
@@ -61,6 +99,11 @@ class Component:
         self.force_gc = kwargs.get("force_gc", False)
         self.max_transparency = kwargs.get("alpha", 255)
         self.is_layout = False
+
+        #render() is specialised for the current state so the common case doesnt go through any branches
+        #(stored as plain functions rather than bound methods so components dont reference themselves)
+        self._render_base = Component._render_plain if self.max_transparency == 255 else Component._render_alpha
+        self._render_impl = self._render_base
         
         #used to track state externally
         self.is_clicked = False
@@ -85,7 +128,7 @@ class Component:
         align: which point on the component are we talking about?
         anchor: where should that point "stick" to on the parent?
         xy: offset for that point"""
-        self.position = Position(align, anchor, xy)
+        self.position = _make_position(align, anchor, (xy[0], xy[1]) if xy is not None else (0, 0))
         return self
 
     def resize(self, xy):
@@ -97,10 +140,12 @@ class Component:
     # ------ manage kids/parents 
 
     def get_recursive_property(self, property):
-        if self.__dict__[property]: return True
-        if not self.is_layout: return False
-        for component in self.components.values():
-            if component.get_recursive_property(property): return True
+        """returns True if property is truthy on the component or anything under it"""
+        stack = [self]
+        while stack:
+            component = stack.pop()
+            if getattr(component, property, False): return True
+            if component.is_layout: stack.extend(component.components.values())
         return False
 
     def cleanup(self):
@@ -155,10 +200,11 @@ class Component:
 
     def debug(self, rendered_surf):
         """render debug info overlay to the rendered surface"""
-        debug_surf = pygame.Surface(rendered_surf.size, pygame.SRCALPHA)
+        debug_surf = _acquire_surf(rendered_surf.size)
         debug_surf.fill(self.debug_colour)
         debug_surf.set_alpha(128)
         rendered_surf.blit(debug_surf, (0,0))
+        _release_surf(debug_surf)
 
         t_height = 0
         for line in self.debug_strings:
@@ -167,29 +213,54 @@ class Component:
             t_height += d_text.height
         return rendered_surf
 
-    def render(self, with_debug):
-        """returns processed pygame surface of the component, runs every frame the component is visible for"""
+    def add_transform(self, transform : ui.transform.Transform):
+        """apply transform to the component's rendered surface until it finishes"""
+        self.transforms.append(transform)
+        self._render_impl = Component._render_full
+
+    def _render_plain(self, with_debug):
+        return self.get_surf(with_debug)
+    
+    def _render_alpha(self, with_debug):
+        raw_surf = self.get_surf(with_debug)
+        if raw_surf: 
+            raw_surf.set_alpha(self.max_transparency)
+        return raw_surf
+    
+    def _render_full(self, with_debug):
         raw_surf = self.get_surf(with_debug)
         if not raw_surf: return 
 
-        if with_debug or self.transforms:
-            render_copy = raw_surf.copy()
-            if with_debug: 
-                render_copy = self.debug(render_copy)
-            for i, transform in enumerate(self.transforms.copy()):
-                render_copy = transform.transform(render_copy)
-                if transform.is_finished:
-                    self.transforms.remove(transform)
-            return render_copy
-        else:
-            if self.max_transparency != 255:
-                raw_surf.set_alpha(self.max_transparency)
-            return raw_surf
+        render_copy = raw_surf.copy()
+        if with_debug: 
+            render_copy = self.debug(render_copy)
+        #compact the unfinished transforms to the front of the list as we go, instead of copying it and removing
+        transforms = self.transforms
+        kept = 0
+        for transform in transforms:
+            render_copy = transform.transform(render_copy)
+            if not transform.is_finished:
+                transforms[kept] = transform
+                kept += 1
+        del transforms[kept:]
+        if not transforms:
+            self._render_impl = self._render_base
+        return render_copy
+
+    def render(self, with_debug):
+        """returns processed pygame surface of the component, runs every frame the component is visible for"""
+        if with_debug:
+            return self._render_full(with_debug)
+        return self._render_impl(self, with_debug)
 
 class Layout(Component):
     """by default, layout all components relative to the first one
     \nif an inheritant wishes to render differently, it needs to also fill out self.layout_map - component reference : ( (top_left_x, y), (bottom_right_x, y) )
     \nalternatively, override handle_mouse() as well"""
+    __slots__ = ("components", "decomponents", "layout_map", "new_transform", "del_transform", 
+                 "_cache_key", "_cached_surf", "_cached_layout_map", "_flat_cache", "_layout_items_src", "_layout_items_rev")
+    cache_surf = True #set to False in inheritants that draw over the result of Layout.get_surf every frame
+
     def __getitem__(self, key):
         return self.components[key]
     def __setitem__(self, key, value):
@@ -199,9 +270,17 @@ class Layout(Component):
 
     def __init__(self, ui_instance, **kwargs):
         super().__init__(ui_instance, **kwargs)
-        self.components : bidict[str, Component] = bidict()
+        self.components : dict[str, Component] = {}
         self.decomponents : dict[str, Component] = {} #for deferred deletion
         self.layout_map : dict[Component, tuple[tuple[int, int], tuple[int, int]]]= {} #component reference : ( (top_left_x, y), (bottom_right_x, y) )
+        
+        #last composited surface from get_surf and what it was built from
+        self._cache_key = None
+        self._cached_surf = None
+        self._cached_layout_map = None
+        self._flat_cache : list[Component] = None #flatten_comp_tree() result, reset whenever the tree changes
+        self._layout_items_src = None #layout_map that _layout_items_rev was built from
+        self._layout_items_rev = None
 
         self.is_layout = True
 
@@ -224,12 +303,13 @@ class Layout(Component):
             component.parent = self
             
             if new_transform:
-                component.transforms.append(new_transform.copy(component.max_transparency))
+                component.add_transform(new_transform.copy(component.max_transparency))
             elif self.new_transform:
-                component.transforms.append(self.new_transform.copy(component.max_transparency))
+                component.add_transform(self.new_transform.copy(component.max_transparency))
 
             self.decomponents.pop(key, None) #adding a component with the same key as one that is being faded out
             self.components[key] = component
+        self._invalidate_flat_cache()
         return self
 
     def queue_del_component(self, key=None, value=None, del_transform : ui.transform.Transform = None):
@@ -238,16 +318,16 @@ class Layout(Component):
         if key is None and value is None:
             raise ui.util.exceptions.UIException("What do you want me to delete?")
         if key is None:
-            key = self.components.inverse[value]
+            key = next(k for k, comp in self.components.items() if comp is value) #only runs once per deletion
         if key in self.decomponents: return
         if value is None:
             value = self.components[key]
         
         value.is_alive = False
         if del_transform:
-            value.transforms.append(del_transform.copy(value.max_transparency))
+            value.add_transform(del_transform.copy(value.max_transparency))
         elif self.del_transform:
-            value.transforms.append(self.del_transform.copy(value.max_transparency))
+            value.add_transform(self.del_transform.copy(value.max_transparency))
         
         self.decomponents[key] = value
 
@@ -255,14 +335,17 @@ class Layout(Component):
         for component in self.components.values():
             component.cleanup()
         del self.components
+        if self._cached_surf is not None:
+            _release_surf(self._cached_surf)
+        self._cache_key = self._cached_surf = self._cached_layout_map = None
 
     def find_comp_under_point(self, point, level=0):
         """returns a reference to the component that point collides with"""
-        for comp, bounds in reversed(self.layout_map.items()):
+        for comp, bounds in self._layout_items_reversed():
             tl, br = bounds
             if ui.util.mth.check_point_in_bounds(tl, point, br):
                 if comp.is_layout:
-                    return comp.find_comp_under_point(np.subtract(point, tl), level+1)
+                    return comp.find_comp_under_point((point[0] - tl[0], point[1] - tl[1]), level+1)
                 else:
                     return comp, level
         if level:
@@ -270,14 +353,32 @@ class Layout(Component):
         else: 
             return None, None
         
-    def flatten_comp_tree(self, comps=None):
-        """returns a list of all components that are in the layout, including ones in any child layouts"""
-        if not comps: comps = [self]
-        for comp in self.components.values():
-            comps.append(comp)
-            if comp.is_layout:
-                comp.flatten_comp_tree(comps)
-        return comps
+    def _layout_items_reversed(self):
+        """returns layout_map's items topmost first
+        \nthe list is reused for as long as layout_map is (cached layouts keep the same map between frames)"""
+        if self._layout_items_src is not self.layout_map or len(self._layout_items_rev) != len(self.layout_map):
+            self._layout_items_src = self.layout_map
+            self._layout_items_rev = list(self.layout_map.items())[::-1]
+        return self._layout_items_rev
+
+    def _invalidate_flat_cache(self):
+        layout = self
+        while layout is not None:
+            layout._flat_cache = None
+            layout = layout.parent
+        
+    def flatten_comp_tree(self):
+        """returns a list of all components that are in the layout, including ones in any child layouts
+        \nthe list is cached until the tree changes so it shouldnt be modified"""
+        if self._flat_cache is None:
+            comps = [self]
+            for comp in self.components.values():
+                if comp.is_layout:
+                    comps.extend(comp.flatten_comp_tree())
+                else:
+                    comps.append(comp)
+            self._flat_cache = comps
+        return self._flat_cache
 
     # ------ manage mouse 
 
@@ -289,18 +390,19 @@ class Layout(Component):
         #within the bounds, it causes on_click to happen. if the mouse is "unclicked" but out of bounds , it silently disables is_clicked. 
         #while is_clicked, while_clicked should always be running.
         first_hit = False
+        mx, my = mouse_pos
 
-        for component, (tl, br) in reversed(self.layout_map.items()):
+        for component, (tl, br) in self._layout_items_reversed():
             if not component.is_alive: continue
             comp_hit = False
-            translated = np.subtract(mouse_pos, tl)
+            translated = (mx - tl[0], my - tl[1])
             
             if component.is_clicked:
                 component.while_clicked(translated)
                 if unclicked:
                     component.on_up()
 
-            if ui.util.mth.check_point_in_bounds(tl, mouse_pos, br) and not first_hit:
+            if not first_hit and tl[0] <= mx <= br[0] and tl[1] <= my <= br[1]: #inlined check_point_in_bounds
                 comp_hit = True
                 first_hit = True
                 if not component.is_hovered: component.on_enter()
@@ -330,6 +432,19 @@ class Layout(Component):
 
     # ------ manage rendering 
 
+    def _reap_decomponents(self):
+        """actually delete the comps queued via queue_del_component that have finished their transforms"""
+        force_gc = False
+        for key, comp in list(self.decomponents.items()):
+            if not comp.transforms:
+                force_gc = force_gc or comp.get_recursive_property("force_gc")
+                comp.cleanup()
+                self.components.pop(key)
+                self.decomponents.pop(key)
+                self._invalidate_flat_cache()
+        if force_gc: #collected later by the ui instance, batched with any other deletions around the same time
+            self.uii.gc_pending = True
+
     def debug(self, rendered_surf):
         rendered_surf = super().debug(rendered_surf)
         for comp, (tl, br) in self.layout_map.items():
@@ -348,8 +463,17 @@ class Layout(Component):
         if surfs[0] is None:
             raise ui.util.exceptions.UILayoutException("Cannot ignore rendering the first component in a layout!")
         
-        result = pygame.Surface(surfs[0].size, pygame.SRCALPHA)
-        self.layout_map[comps[0]] = ((0,0), result.size)
+        #kids still have to render every frame since thats what moves their animations along
+        #but if they all hand back the exact same surfaces as last frame, the old composite is still valid
+        #(holding onto the surfaces themselves means their ids cant get reused by new ones)
+        scale = self.uii.scaler.min(1)
+        cache_key = (with_debug, scale, *((comp, comp.position, surf, surf.get_alpha() if surf else None) for comp, surf in zip(comps, surfs)))
+        if self.cache_surf and cache_key == self._cache_key:
+            self.layout_map = self._cached_layout_map
+            return self._cached_surf
+
+        result = _acquire_surf(surfs[0].size)
+        layout_map = {comps[0] : ((0,0), result.size)}
         result.blit(surfs[0], (0,0))
 
         for comp, surf in zip(comps[1:], surfs[1:]):
@@ -360,27 +484,23 @@ class Layout(Component):
             if surf is None:
                 continue
             
-            tl_pos = comp.position.convert_anchor(surf.size, result.size, self.uii.scaler.xy_min((1,1)))
+            tl_pos = comp.position.convert_anchor(surf.size, result.size, (scale, scale))
             result.blit(surf, tl_pos)
-            self.layout_map[comp] = (tl_pos, np.add(tl_pos, surf.size))
-
+            layout_map[comp] = (tl_pos, (tl_pos[0] + surf.width, tl_pos[1] + surf.height))
+
+        self.layout_map = layout_map
+        if self._cached_surf is not None: #last frame's surface has been blitted by the parent already
+            _release_surf(self._cached_surf)
+        self._cached_surf = result
+        if self.cache_surf:
+            self._cache_key, self._cached_layout_map = cache_key, layout_map
         return result
     
     def render(self, with_debug):
         #override this here to add one extra bit of functionality
         #after rendering all comps in a layout, handle comps that were deleted via queue_delete
         result = super().render(with_debug)
-        deleted = []
-        force_gc = False
-        for key, comp in self.decomponents.items():
-            if not comp.transforms:
-                force_gc = force_gc or comp.get_recursive_property("force_gc")
-                comp.cleanup()
-                self.components.pop(key)
-                deleted.append(key)
-        [self.decomponents.pop(key) for key in deleted]
-        if force_gc:
-            gc.collect()
+        self._reap_decomponents()
         return result
 
 class RootLayout(Layout):
@@ -399,18 +519,24 @@ class RootLayout(Layout):
         self.debug_mouse_pos = translated_mouse_coords
 
     def render(self, display_surf, with_debug):
+        _surf_pool_next_frame()
         comps = list(self.components.values())
+        comps.append(comps.pop(0)) #first component gets drawn last
+        display_res = self.uii.scaler.display_res
+        scale = self.uii.scaler.min(1)
+        scale = (scale, scale)
+        layout_map = self.layout_map
 
-        for comp in (*comps[1:], comps[0]):
+        for comp in comps:
             if not comp.position:
                 raise ui.util.exceptions.UILayoutException("Root level components need to have position info!")
             
             surf = comp.render(with_debug)
             if surf is None: continue
 
-            tl_pos = comp.position.convert_anchor(surf.size, self.uii.scaler.display_res, self.uii.scaler.xy_min((1,1)))
+            tl_pos = comp.position.convert_anchor(surf.size, display_res, scale)
             display_surf.blit(surf, tl_pos)
-            self.layout_map[comp] = (tl_pos, np.add(tl_pos, surf.size))
+            layout_map[comp] = (tl_pos, (tl_pos[0] + surf.width, tl_pos[1] + surf.height))
 
         if with_debug and self.debug_mouse_pos is not None:
             pygame.draw.aacircle(display_surf, [255]*3, self.debug_mouse_pos, 10)
@@ -418,14 +544,4 @@ class RootLayout(Layout):
             debug_search = self.uii.fonts[24].render(f"{level} | {comp} | {comp.parent if comp else None}", 1, [255]*3)
             display_surf.blit(debug_search, self.debug_mouse_pos)
 
-        deleted = []
-        force_gc = False
-        for key, comp in self.decomponents.items():
-            if not comp.transforms:
-                force_gc = force_gc or comp.get_recursive_property("force_gc")
-                comp.cleanup()
-                self.components.pop(key)
-                deleted.append(key)
-        [self.decomponents.pop(key) for key in deleted]
-        if force_gc:
-            gc.collect()
\ No newline at end of file
+        self._reap_decomponents()
\ No newline at end of file
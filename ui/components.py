@@ -1,8 +1,8 @@
 from typing import Literal
+from collections import OrderedDict
+import functools
 
-from bidict import bidict
 import pygame
-import numpy as np
 
 import ui.base
 import ui.transform
@@ -13,6 +13,12 @@ import ui.util.mth
 
 AlignType = Literal["topleft", "topmid", "topright", "midleft", "midmid", "midright", "botleft", "botmid", "botright"]
 
+BLUR_CACHE_SIZE = 32
+_blur_cache : OrderedDict[tuple, pygame.Surface] = OrderedDict() #recent BlurredSurface results, see BlurredSurface.blur
+TEXT_CACHE_SIZE = 256
+AVG_COLOUR_CACHE_SIZE = 128
+_avg_colour_cache : dict[tuple, tuple] = {} #(media path, first frame size) -> average colour, see TileButton
+
 class PlainSurface(ui.base.Component):
     """pygame surfaces wrapped in a component, allows them to interact with the mouse and layout system"""
     def __repr__(self):
@@ -34,13 +40,15 @@ class Overlay(PlainSurface):
         if not uii.display:
             raise ui.util.exceptions.UIRenderingException("Can't use Overlay when UI instance is not initialised with reference to pygame display!")
         super().__init__(uii, None, **kwargs)
-        self.screenshot = uii.display.copy()
+        #only ever shown blurred and blurring happens at the downscaled size anyways, so only keep the downscaled screenshot
+        downscale = uii.settings.BLUR_DOWNSCALE
+        self.screenshot = pygame.transform.smoothscale(uii.display, (uii.display.width // downscale, uii.display.height // downscale))
         self.is_occluder = True
-        self.surface = ui.util.graphics.blur_quick(self.screenshot, 31, scale=uii.settings.BLUR_DOWNSCALE)
+        self.surface = pygame.transform.scale(ui.util.graphics.blur_quick(self.screenshot, 31), uii.display.size)
 
     def resize(self, xy):
-        screenshot = ui.util.graphics.scale_surface(self.screenshot, np.multiply(self.screenshot.size, xy), "fit")
-        self.surface = ui.util.graphics.blur_quick(screenshot, 31, scale=self.uii.settings.BLUR_DOWNSCALE)
+        screenshot = ui.util.graphics.scale_surface(self.screenshot, ui.util.mth.mul_2d(self.screenshot.size, xy), "fit")
+        self.surface = pygame.transform.scale_by(ui.util.graphics.blur_quick(screenshot, 31), self.uii.settings.BLUR_DOWNSCALE)
 
 class BlurredSurface(PlainSurface):    
     def __repr__(self):
@@ -60,11 +68,33 @@ class BlurredSurface(PlainSurface):
         if not surface:
             surface = pygame.Surface(size)
             surface.fill(colour)
-        self.surface = ui.util.graphics.blur_transparent(surface, strength, padding, self.uii.settings.BLUR_DOWNSCALE, brighten)
+
+        #buttons get torn down and rebuilt with the same media all the time (switching modes, going back to the main menu)
+        #so remember recent blurs by the source's pixels, hashing them is a lot cheaper than blurring them again
+        key = (surface.size, surface.get_masks(), hash(surface.get_buffer().raw), strength, brighten, padding, self.uii.settings.BLUR_DOWNSCALE)
+        if key in _blur_cache:
+            _blur_cache.move_to_end(key)
+        else:
+            blurred = ui.util.graphics.blur_transparent(surface, strength, padding, self.uii.settings.BLUR_DOWNSCALE, brighten)
+            if pygame.display.get_surface() is not None: #match the display's pixel format once here instead of every blit
+                blurred = blurred.convert_alpha()
+            _blur_cache[key] = blurred
+            if len(_blur_cache) > BLUR_CACHE_SIZE:
+                _blur_cache.popitem(last=False)
+        self._original_blurred = _blur_cache[key] #full quality result, resize_only always scales from this
+        self.surface = self._original_blurred.copy() #callers change the alpha of their copy
+
+    def resize_only(self, new_size):
+        """smoothscales the last blur result to new_size instead of blurring the source again
+        \nonly shrinks (or keeps the size), returns False if new_size is bigger so the caller can blur() properly instead"""
+        if new_size[0] > self._original_blurred.width or new_size[1] > self._original_blurred.height:
+            return False
+        self.surface = pygame.transform.smoothscale(self._original_blurred, (int(new_size[0]), int(new_size[1])))
+        return True
 
     def resize(self, xy):
         raise ui.util.exceptions.UIRenderingException("Call blur() on the new surface you want to blur instead.") 
-        #quality gets bad if resizing blurred surfaces
+        #quality gets bad if resizing blurred surfaces (upscaling, anyways, see resize_only)
 
 class MediaSurface(PlainSurface):
     def __repr__(self):
@@ -95,6 +125,35 @@ class MediaSurface(PlainSurface):
         self.frame_idx = (self.frame_idx+1)%len(self.wrapper)
         self.surface = self.wrapper[self.frame_idx]
 
+def _tint_text(mask : pygame.Surface, colour, bg=None):
+    """recolours white antialiased text (rendered without a bg) to colour, on top of a solid bg if given
+    \nlooks the same as rendering the text again with those colours, without going through the font rasteriser"""
+    tinted = mask.copy()
+    tinted.fill(colour, special_flags=pygame.BLEND_RGBA_MULT)
+    if bg is None:
+        return tinted
+    result = pygame.Surface(mask.size)
+    result.fill(bg)
+    result.blit(tinted, (0,0))
+    return result
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _render_text(font_path, font_size, text, colour, bg, shadowed):
+    """renders text the way TextSurface shows it, returns (surface, highlighted alt)
+    \ncached since the same strings get rendered over and over by different components (button labels, toasts, debug text)
+    \nkeyed on the font's path and scaled size rather than the font itself so the cache doesn't keep evicted fonts alive"""
+    #rasterise the glyphs once in white, every colour variant is just that tinted
+    mask = ui.util.wrappers.get_font(font_path, font_size).render(text, True, [255]*3)
+    surface = _tint_text(mask, colour, bg)
+
+    if shadowed:
+        black = _tint_text(mask, [0]*3, [0]*3 if bg is not None else None)
+        shadow = ui.util.graphics.blur_transparent(black, 4, 10)
+        shadow.blit(surface, (5,5))
+        surface = shadow
+
+    return surface, _tint_text(mask, [0]*3, [255]*3)
+
 class TextSurface(PlainSurface):
     def __repr__(self):
         return f"TextSurface ({self.text})"
@@ -118,17 +177,9 @@ class TextSurface(PlainSurface):
         self._refresh()
         
     def _refresh(self):
-        text = self.uii.fonts[self.size].render(self.text, True, self.colour, self.bg)
-
-        if self.shadowed:
-            black = self.uii.fonts[self.size].render(self.text, True, [0]*3, [0]*3 if self.bg is not None else None)
-            shadowed = ui.util.graphics.blur_transparent(black, 4, 10)
-            shadowed.blit(text, (5,5))
-            self.surface = shadowed
-        else:
-            self.surface = text
-
-        self.alt = self.uii.fonts[self.size].render(self.text, True, [0]*3, [255]*3)
+        surface, alt = _render_text(ui.util.wrappers.FONT_PATH, self.uii.fonts.scaled_size(self.size), self.text, tuple(self.colour), 
+                                    tuple(self.bg) if self.bg is not None else None, self.shadowed)
+        self.surface, self.alt = surface.copy(), alt.copy() #transforms change the alpha of whatever surface they get
         if self.is_highlighted: self.surface, self.alt = self.alt, self.surface
 
     def change_text(self, new_text):
@@ -137,12 +188,13 @@ class TextSurface(PlainSurface):
         self._refresh()
 
     def change_colour(self, new_colour):
-        if ui.util.mth.comp_3d(self.colour, new_colour): return
+        if new_colour is self.colour or ui.util.mth.comp_3d(self.colour, new_colour): return #same list passed back most of the time
         self.colour = new_colour
         self._refresh()
 
     def change_bg(self, new_bg):
-        if ui.util.mth.comp_3d(self.bg, new_bg): return
+        if new_bg is self.bg: return #also covers None -> None
+        if new_bg is not None and self.bg is not None and ui.util.mth.comp_3d(self.bg, new_bg): return
         self.bg = new_bg
         self._refresh()
 
@@ -191,16 +243,18 @@ class LR_Layout(ui.base.Layout):
         if not cum_width: return
 
         #pass 2
-        result = pygame.Surface((cum_width + self.uii.scaler.min(self.hz_padding)*(len(surfs)-1), max_height+self.uii.scaler.min(self.vr_padding)), pygame.SRCALPHA)
+        hz_pad, vr_pad = self.uii.scaler.min(self.hz_padding), self.uii.scaler.min(self.vr_padding) #same for every component
+        result = pygame.Surface((cum_width + hz_pad*(len(surfs)-1), max_height+vr_pad), pygame.SRCALPHA)
         prog_width = 0 #width progressively added to
         self.layout_map = {}
+        blit_seq = []
         for component, surf in zip(self.components.values(), surfs):
-            tl_pos = np.array((prog_width, self.uii.scaler.min(self.vr_padding)/2))
             align = component.position.align[:3] if component.position else self.default_align
-            tl_pos[1] += (max_height - surf.height) * 0.5 * ("top", "mid", "bot").index(align)
-            prog_width += surf.width + self.uii.scaler.min(self.hz_padding)
-            result.blit(surf, tl_pos)
-            self.layout_map[component] = (tl_pos, np.add(tl_pos, surf.size))
+            tl_pos = (prog_width, vr_pad*0.5 + (max_height - surf.height) * 0.5 * ("top", "mid", "bot").index(align))
+            prog_width += surf.width + hz_pad
+            blit_seq.append((surf, tl_pos))
+            self.layout_map[component] = (tl_pos, (tl_pos[0] + surf.width, tl_pos[1] + surf.height))
+        result.fblits(blit_seq) #one call into pygame for every component
 
         return result
     
@@ -234,16 +288,18 @@ class TB_Layout(ui.base.Layout):
         if not cum_height: return
 
         #pass 2
-        height = max(cum_height + self.uii.scaler.min(self.vr_padding)*(len(surfs)-1), 1)
-        result = pygame.Surface((max_width+self.uii.scaler.min(self.hz_padding), height), pygame.SRCALPHA)
+        hz_pad, vr_pad = self.uii.scaler.min(self.hz_padding), self.uii.scaler.min(self.vr_padding) #same for every component
+        height = max(cum_height + vr_pad*(len(surfs)-1), 1)
+        result = pygame.Surface((max_width+hz_pad, height), pygame.SRCALPHA)
         prog_height = 0 #height progressively added to
+        blit_seq = []
         for component, surf in zip(self.components.values(), surfs):
-            tl_pos = np.array((self.uii.scaler.min(self.hz_padding)/2, prog_height)) #top left coordinate of the surface
             align = component.position.align[3:] if component.position else self.default_align
-            tl_pos[0] += (max_width - surf.width) * 0.5 * ("left", "mid", "right").index(align)
-            prog_height += surf.height + self.uii.scaler.min(self.vr_padding)
-            result.blit(surf, tl_pos)
-            self.layout_map[component] = (tl_pos, np.add(tl_pos, surf.size))
+            tl_pos = (hz_pad*0.5 + (max_width - surf.width) * 0.5 * ("left", "mid", "right").index(align), prog_height) #top left coordinate of the surface
+            prog_height += surf.height + vr_pad
+            blit_seq.append((surf, tl_pos))
+            self.layout_map[component] = (tl_pos, (tl_pos[0] + surf.width, tl_pos[1] + surf.height))
+        result.fblits(blit_seq) #one call into pygame for every component
         
         return result
     
@@ -252,6 +308,21 @@ class BaseButton(ui.base.Layout):
         super().__init__(uii, **kwargs)
         self.is_toggled=bool(toggled)
         self.new_transform = self.del_transform = None
+        self.bw_strength = 0
+        self._grey_src = None #last layout surface that was fully greyed out
+        self._grey_frame = None
+
+    def _greyscale(self, coloured):
+        """fades coloured to greyscale depending on bw_strength"""
+        strength = self.bw_strength/self.uii.settings.BUTTON_TIME
+        if strength < 1:
+            self._grey_src = None
+            return ui.util.graphics.blend_greyscale(coloured, strength)
+        #buttons spend most of their time fully greyed out, and the layout surface is reused while nothing in it changes
+        #so only regrey it when its a different surface
+        if coloured is not self._grey_src:
+            self._grey_src, self._grey_frame = coloured, pygame.transform.grayscale(coloured)
+        return self._grey_frame
 
     def toggle(self, toggle=None):
         self.is_toggled = bool(toggle) if toggle is not None else not self.is_toggled
@@ -268,24 +339,34 @@ class PaneButton(BaseButton):
                  text_colour=None, toggled=False, **kwargs):
         super().__init__(uii, toggled, **kwargs)
         self.raw_size = bg_size
-        self.bw_strength = 0
         self.bg = MediaSurface(uii, bg_path, "fill", self.raw_size, parent=self)
         self.blurred_bg = BlurredSurface(uii, 1, 0, self.bg[0], padding=0, parent=self)
+        self._fit_blurred_bg()
         
         smart_colour = text_colour if text_colour else ui.util.graphics.smart_colour(self.bg[0])       
-        self.components = bidict({
+        self.components = {
             "bloom" : BlurredSurface(uii, 9, 1.6, self.bg[0], parent=self),
             "mixed_bg" : PlainSurface(uii, self.blurred_bg.surface, parent=self),
             "text" : TextSurface(uii, text, text_size, smart_colour, shadowed=True, parent=self)
-        })
+        }
 
         self.hovered_in_bounds = False
         
     def resize(self, xy):
         self.bg.resize(xy)
         self.components["text"].resize(xy)
-        self.components["bloom"].blur(9, 1.6, self.bg[0])
-        self.blurred_bg.blur(1, 0, self.bg[0], padding=0)
+        #same media at a new size, so shrinking the old blurs looks the same as blurring again
+        padding = self.uii.scaler.min(self.uii.settings.BLOOM_PADDING)
+        if not self.components["bloom"].resize_only(ui.util.mth.add_2d(self.bg[0].size, (padding, padding))):
+            self.components["bloom"].blur(9, 1.6, self.bg[0])
+        if not self.blurred_bg.resize_only(self.bg.surface.size):
+            self.blurred_bg.blur(1, 0, self.bg[0], padding=0)
+            self._fit_blurred_bg()
+
+    def _fit_blurred_bg(self):
+        #the downscaled blur can come back a pixel off, which would make blend() rescale it every frame
+        if self.blurred_bg.surface.size != self.bg.surface.size:
+            self.blurred_bg.surface = pygame.transform.smoothscale(self.blurred_bg.surface, self.bg.surface.size)
 
     def while_hovered(self, translated_mouse_coords):
         self.hovered_in_bounds = not self.components["bloom"].is_hovered
@@ -301,25 +382,29 @@ class PaneButton(BaseButton):
             self.click_func(*self.click_args)
 
     def get_surf(self, with_debug):
+        button_time = self.uii.settings.BUTTON_TIME
         #handle special effects when hovering over component
         if (self.hovered_in_bounds or self.is_toggled):
             self.bw_strength = max(0, self.bw_strength-1)
             self.bg.next_frame()
 
-        elif not (self.hovered_in_bounds or self.is_toggled) and self.bw_strength < self.uii.settings.BUTTON_TIME:
+        elif self.bw_strength < button_time:
             self.bw_strength += 1
         
-        if self.bw_strength == self.uii.settings.BUTTON_TIME:
+        if self.bw_strength == button_time:
             self.bg.set_frame(0)
 
-        self.debug_strings = [f"Frame IDX: {self.bg.frame_idx}",
-                              f"Loadable / Total: {self.bg.wrapper.max_len}/{len(self.bg)}"]
+        if with_debug: #only read by debug()
+            self.debug_strings = [f"Frame IDX: {self.bg.frame_idx}",
+                                  f"Loadable / Total: {self.bg.wrapper.max_len}/{len(self.bg)}"]
 
-        self.components["mixed_bg"].surface = ui.util.graphics.blend(self.bg.surface, self.blurred_bg.surface, self.bw_strength/self.uii.settings.BUTTON_TIME)
-        self.components["bloom"].surface.set_alpha(255 * (1-(self.bw_strength/self.uii.settings.BUTTON_TIME)))
+        fade = self.bw_strength/button_time
+        components = self.components
+        components["mixed_bg"].surface = ui.util.graphics.blend(self.bg.surface, self.blurred_bg.surface, fade)
+        components["bloom"].surface.set_alpha(255 * (1-fade))
 
         coloured = super().get_surf(with_debug)
-        return ui.util.graphics.blend_greyscale(coloured, self.bw_strength/self.uii.settings.BUTTON_TIME)
+        return self._greyscale(coloured)
             
 class TileButton(BaseButton):
     """text aligned right media aligned left solid colour background"""  
@@ -332,25 +417,35 @@ class TileButton(BaseButton):
                  text_colour=None, toggled=False, **kwargs):
         super().__init__(uii, toggled, **kwargs)
         self.raw_size = bg_size
-        self.media = MediaSurface(uii, media_path, "fit", np.subtract(self.raw_size, 30), parent=self)
-        self.media_colour = np.divide(pygame.transform.average_color(self.media[0], consider_alpha=True), 4)
+        self.media = MediaSurface(uii, media_path, "fit", ui.util.mth.sub_2d(self.raw_size, (30, 30)), parent=self)
+        self.media_colour = self._average_colour()
         self.bg = PlainSurface(self.uii, ui.util.graphics.coloured_square(self.media_colour, 
                                                                            self.uii.scaler.xy_min(self.raw_size)), parent=self)
 
-        self.components = bidict({
+        self.components = {
             "bloom" : BlurredSurface(uii, 9, 1.6, self.bg.surface, parent=self),
             "bg" : self.bg,
             "media" : self.media.place("midleft", "midleft", (self.uii.settings.BLOOM_PADDING/2 + 15, 0)),
             "text" : TextSurface(uii, text, text_size, text_colour if text_colour is not None else [255]*3, parent=self)
                                 .place("midright", "midright", (-(self.uii.settings.BLOOM_PADDING/2 + 15), 0))
-        })
+        }
         
-        self.bw_strength = 0
         self.hovered_in_bounds = False
         
+    def _average_colour(self):
+        #the same media backs buttons that get rebuilt all the time, no need to scan every pixel of it again
+        key = (self.media.wrapper.path, self.media[0].size)
+        if key not in _avg_colour_cache:
+            if len(_avg_colour_cache) >= AVG_COLOUR_CACHE_SIZE:
+                del _avg_colour_cache[next(iter(_avg_colour_cache))] #oldest
+            _avg_colour_cache[key] = tuple(c >> 2 for c in pygame.transform.average_color(self.media[0], consider_alpha=True))
+        return _avg_colour_cache[key]
+
     def resize(self, xy):
         self.bg.surface = ui.util.graphics.coloured_square(self.media_colour, self.uii.scaler.xy_min(self.raw_size))
-        self.components["bloom"].blur(9, 1.6, self.bg.surface)
+        padding = self.uii.scaler.min(self.uii.settings.BLOOM_PADDING)
+        if not self.components["bloom"].resize_only(ui.util.mth.add_2d(self.bg.surface.size, (padding, padding))):
+            self.components["bloom"].blur(9, 1.6, self.bg.surface)
         self.components["text"].resize(xy)
         self.media.resize(xy)
 
@@ -368,24 +463,28 @@ class TileButton(BaseButton):
             self.click_func(*self.click_args)
 
     def get_surf(self, with_debug):
+        button_time = self.uii.settings.BUTTON_TIME
         if (self.hovered_in_bounds or self.is_toggled):
             self.bw_strength = max(0, self.bw_strength-1)
             self.media.next_frame()
             
-        elif not (self.hovered_in_bounds or self.is_toggled) and self.bw_strength < self.uii.settings.BUTTON_TIME:
+        elif self.bw_strength < button_time:
             self.bw_strength += 1
             self.media.set_frame(0)
 
-        self.components["bloom"].surface.set_alpha(255 * (1-(self.bw_strength/self.uii.settings.BUTTON_TIME)))
-        self.debug_strings = [f"Frame IDX: {self.media.frame_idx}",
-                              f"Loadable / Total: {self.media.wrapper.max_len}/{len(self.media)}"]
+        self.components["bloom"].surface.set_alpha(255 * (1-(self.bw_strength/button_time)))
+        if with_debug: #only read by debug()
+            self.debug_strings = [f"Frame IDX: {self.media.frame_idx}",
+                                  f"Loadable / Total: {self.media.wrapper.max_len}/{len(self.media)}"]
 
         coloured = super().get_surf(with_debug)
-        return ui.util.graphics.blend_greyscale(coloured, self.bw_strength/self.uii.settings.BUTTON_TIME)
+        return self._greyscale(coloured)
 
 # ----------------------------------------------------------------------------------------
 
 class Toast(BaseButton):
+    cache_surf = False #draws the timer bar straight onto the layout surface
+
     def __repr__(self):
         return f"Toast ({self.text.text})"
     def __init__(self, uii, text, text_colour, padding=20, duration=None, 
@@ -393,12 +492,12 @@ class Toast(BaseButton):
         
         super().__init__(uii, **kwargs)
         self.text = TextSurface(uii, text, 24, text_colour, parent=self)
-        self.components = bidict({
-            "bg" : PlainSurface(uii, ui.util.graphics.coloured_square(np.divide(text_colour, 2).astype(np.uint8), 
-                                                                      np.add(self.text.surface.size, uii.scaler.min(padding)), 
+        self.components = {
+            "bg" : PlainSurface(uii, ui.util.graphics.coloured_square(tuple(c >> 1 for c in text_colour), 
+                                                                      ui.util.mth.add_2d(self.text.surface.size, (uii.scaler.min(padding),)*2), 
                                                                       alpha=92), parent=self),
             "text" : self.text
-        })
+        }
         self.padding = padding
         self.duration = duration * uii.settings.FPS if duration else uii.settings.TOAST_TIME
         self.elapsed = 0
@@ -407,8 +506,8 @@ class Toast(BaseButton):
     def resize(self, xy):
         self.text.resize(xy)
         self.components["bg"].surface = ui.util.graphics.coloured_square(self.text.colour, 
-                                                                         np.add(self.text.surface.size, 
-                                                                             self.uii.scaler.min(self.padding)), 
+                                                                         ui.util.mth.add_2d(self.text.surface.size, 
+                                                                                            (self.uii.scaler.min(self.padding),)*2), 
                                                                          alpha=92)
 
     def get_surf(self, with_debug):
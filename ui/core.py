@@ -1,5 +1,6 @@
 import time
 import random
+import gc
 
 import pygame
 import numpy as np
@@ -7,6 +8,7 @@ import numpy as np
 import ui.base
 import ui.components
 import ui.util.wrappers
+import ui.util.mth
 
 #mini ui structure
 # -> simplest building block is a component
@@ -33,6 +35,7 @@ class Settings:
         #anim_speed is the only exposed setting, everything else is tied to it
         self.FPS = new
         self.FADE_TIME = 0.2 * self.ANIM_SPEED * new
+        self.GC_INTERVAL = 0.5 * new #min frames between forced garbage collections
         self.BUTTON_TIME = 0.2 * self.ANIM_SPEED * new
         self.TOAST_TIME = 5 * self.ANIM_SPEED * new
 
@@ -76,6 +79,10 @@ class UIInstance:
         self.root.add_components({None : self.toasts})
         
         self.elapsed_frames = 0
+        self.gc_pending = False #set when a force_gc component gets deleted
+        self.last_gc_frame = 0
+        self._debug_grid : pygame.Surface = None #drawn once per resolution, see _get_debug_grid
+        self._alpha_debug : pygame.Surface = None #reused target for debug mode 2
         self.debug = False
         self.display = kwargs.get("display_surf", None) #directly draw to the display, enables more involved components but should be optional for maximum library modularity
         self.logger = kwargs.get("logger", None) #logger can optionally be set to enable debugging, but it isn't necessary
@@ -103,6 +110,7 @@ class UIInstance:
     def resize(self, new_res):
         self.settings.display_res = new_res
         self.scaler.display_res = new_res
+        self._debug_grid = self._alpha_debug = None
         
         start = time.perf_counter()
         self.fonts.resize()
@@ -137,18 +145,25 @@ class UIInstance:
 
         display.fill([0]*3)
 
-        if self.debug == 1:
-            debug_overlay = pygame.Surface(display.size, pygame.SRCALPHA)
-            debug_overlay.set_alpha(64)
         if self.debug == 2:
-            alpha_debug = pygame.Surface(display.size, pygame.SRCALPHA)
+            if self._alpha_debug is None or self._alpha_debug.size != display.size:
+                self._alpha_debug = pygame.Surface(display.size, pygame.SRCALPHA)
+            alpha_debug = self._alpha_debug
+            alpha_debug.fill((0,0,0,0))
 
         self.root.render(display if self.debug != 2 else alpha_debug, self.debug == 1)
 
         if self.debug == 2:
-            alpha = pygame.surfarray.array_alpha(alpha_debug)
-            grayscale_array = np.stack((alpha, alpha, alpha), axis=-1)
-            pygame.surfarray.blit_array(display, grayscale_array)
+            alpha = pygame.surfarray.pixels_alpha(alpha_debug)
+            pixels = pygame.surfarray.pixels3d(display)
+            np.copyto(pixels, alpha[:, :, None], casting="no") #broadcast into all 3 channels instead of stacking a copy, both are uint8 views so nothing gets converted
+            del pixels, alpha #unlock the surfaces
+
+        #gc.collect() is a multi ms pause, so deletions in quick succession only get one between them
+        if self.gc_pending and self.elapsed_frames - self.last_gc_frame >= self.settings.GC_INTERVAL:
+            gc.collect()
+            self.gc_pending = False
+            self.last_gc_frame = self.elapsed_frames
 
         self.elapsed_frames += 1        
         frame_time = (time.perf_counter() - start_time) * 1000
@@ -157,17 +172,25 @@ class UIInstance:
         
         if update_time:
             update_time = self.fonts[24].render(f"Update time: {update_time*1000:02f}ms", 1, [255]*3 if update_time*1000 < 1 else [255,0,0])
-            display.blit(update_time, np.subtract(self.scaler.display_res, update_time.size))
+            display.blit(update_time, ui.util.mth.sub_2d(self.scaler.display_res, update_time.size))
         
         if self.debug == 1:
-            for i in range(1, 6):
-                pygame.draw.line(debug_overlay, [255]*3, (0, self.scaler.display_res[1]/6*i), (self.scaler.display_res[0], self.scaler.display_res[1]/6*i))
-                pygame.draw.line(debug_overlay, [255]*3, (self.scaler.display_res[0]/6*i, 0), (self.scaler.display_res[0]/6*i, self.scaler.display_res[1]))
-            display.blit(debug_overlay, (0,0))
+            display.blit(self._get_debug_grid(display.size), (0,0))
         
         if not self.display:
             return display
         
+    def _get_debug_grid(self, size):
+        """6x6 grid drawn over the display in debug mode 1, only redrawn when the resolution changes"""
+        if self._debug_grid is None or self._debug_grid.size != size:
+            self._debug_grid = pygame.Surface(size, pygame.SRCALPHA)
+            self._debug_grid.set_alpha(64)
+            width, height = self.scaler.display_res
+            for i in range(1, 6):
+                pygame.draw.line(self._debug_grid, [255]*3, (0, height/6*i), (width, height/6*i))
+                pygame.draw.line(self._debug_grid, [255]*3, (width/6*i, 0), (width/6*i, height))
+        return self._debug_grid
+
     def update(self, events, debug_time=None):
         self.handle_events(events)
         return self.draw(debug_time)
\ No newline at end of file
@@ -1,18 +1,26 @@
+import math
+
 import pygame
 
 import ui.util.graphics
 
 class Transform:
+    _luts : dict[float, tuple[float, ...]] = {} #duration -> smoothstep value for every frame, shared by every transform of that length
+
     def __init__(self, duration, reverse=False):
         self.duration = duration #in frames
+        if duration not in Transform._luts: #durations come from fps based settings so they can be fractional
+            steps = (min(i / duration, 1) for i in range(math.ceil(duration) + 1))
+            Transform._luts[duration] = tuple(3 * p**2 - 2 * p**3 for p in steps)
+        self._lut = Transform._luts[duration]
         self.anim_counter = 0
         self.is_finished = False
         self.is_reversed = reverse
         self.max_transparency = 255
+        self._scratch : pygame.Surface = None #reused by transforms that draw into a new surface every frame
 
     def prog(self):
-        prog = self.anim_counter / self.duration
-        prog = 3 * prog**2 - 2 * prog**3
+        prog = self._lut[min(self.anim_counter, len(self._lut) - 1)]
         if self.is_reversed: return 1 - prog
         return prog
     
@@ -24,7 +32,17 @@ class Transform:
         new = self.__class__.__new__(self.__class__) 
         new.__dict__ = self.__dict__.copy()
         new.max_transparency = max_transparency           
+        new._scratch = None
         return new
+
+    def _get_scratch(self, full_size, size):
+        """returns a cleared SRCALPHA surface of size, cut out of one that is only allocated once per animation
+        \nfull_size: the largest size this transform is going to need"""
+        if self._scratch is None or self._scratch.width < size[0] or self._scratch.height < size[1]:
+            self._scratch = pygame.Surface(full_size, pygame.SRCALPHA)
+        result = self._scratch.subsurface((0, 0, *size))
+        result.fill((0,0,0,0))
+        return result
         
 class FadeIn(Transform):
     def transform(self, surface):
@@ -35,8 +53,8 @@ class FadeIn(Transform):
 class DisappearVert(Transform):
     def transform(self, surface):
         super().transform(surface)
-        height = surface.height*(1-self.prog())
-        result = pygame.Surface((surface.width, height), pygame.SRCALPHA)
+        height = int(surface.height*(1-self.prog()))
+        result = self._get_scratch(surface.size, (surface.width, height))
         result.set_alpha(self.max_transparency*(1-self.prog()))
         result.blit(surface, (0, -((surface.height-height)/2)))
         return result
@@ -44,8 +62,8 @@ class DisappearVert(Transform):
 class DisappearHorz(Transform):
     def transform(self, surface):
         super().transform(surface)
-        width = surface.width*(1-self.prog())
-        result = pygame.Surface((width, surface.height), pygame.SRCALPHA)
+        width = int(surface.width*(1-self.prog()))
+        result = self._get_scratch(surface.size, (width, surface.height))
         result.set_alpha(self.max_transparency*(1-self.prog()))
         result.blit(surface, (-((surface.width-width)/2), 0))
         return result
\ No newline at end of file
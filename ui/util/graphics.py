@@ -1,28 +1,31 @@
 from typing import Literal
+import weakref
 
 import pygame
 import numpy as np
 import cv2
 
+SMART_COLOUR_CACHE_SIZE = 256
+_smart_colour_cache : dict[int, np.ndarray] = {} #id(surface) -> smart_colour result
+
 def centre(parent : tuple, child : tuple):
-    return np.divide(np.subtract(parent, child), 2)
+    """top left position that centres child inside parent"""
+    return ((parent[0] - child[0]) * 0.5, (parent[1] - child[1]) * 0.5)
     
 def blur_transparent(surface : pygame.Surface, k_size, padding, scale=1, brighten_by=0):
     bg = pygame.Surface(np.add(surface.size, (padding, padding)), pygame.SRCALPHA)
     bg.blit(surface, (padding/2,padding/2))
-    if scale:
+    if scale and scale != 1: #matches the upscale below, which already skips a scale of 1
         bg = pygame.transform.smoothscale_by(bg, 1/scale)
     bg = pygame.transform.gaussian_blur(bg, k_size)
     
     #brightening pass
     if brighten_by:
-        bg_array = pygame.surfarray.pixels3d(bg).astype(np.uint16)
-        alpha = pygame.surfarray.array_alpha(bg).astype(np.uint16)
-        bg_array = np.clip(bg_array * brighten_by, 0, 255).astype(np.uint8)
-        alpha = np.clip(alpha * brighten_by, 0, 255).astype(np.uint8)
-        pygame.surfarray.array_to_surface(bg, bg_array)
-        bg.convert_alpha()
-        np.add(np.zeros_like(alpha), alpha, pygame.surfarray.pixels_alpha(bg))
+        #colour and alpha get scaled by the same amount, so do every byte of the surface at once in place
+        #(convertScaleAbs is a saturating multiply, so it clips to 255 on the way)
+        pixels = np.frombuffer(bg.get_buffer(), dtype=np.uint8)
+        cv2.convertScaleAbs(pixels, dst=pixels, alpha=brighten_by)
+        del pixels #unlock the surface
 
     if scale > 1:
         bg = pygame.transform.smoothscale_by(bg, scale)
@@ -32,10 +35,14 @@ def blur_quick(surface, k_size, scale=1):
     if not k_size % 2:
         k_size += 1
     scaled = pygame.transform.scale_by(surface, 1/scale)
-    array = pygame.surfarray.pixels3d(scaled)
-    edited = cv2.GaussianBlur(array, (k_size, k_size), 5)
-    del array
-    pygame.surfarray.blit_array(scaled, np.array(edited))
+    #3 box blurs look close enough to a gaussian and dont get slower as the kernel grows
+    box = max(3, k_size // 3) | 1
+    array = pygame.surfarray.array3d(scaled)
+    edited = np.empty_like(array)
+    cv2.boxFilter(array, -1, (box, box), dst=edited, borderType=cv2.BORDER_REPLICATE)
+    cv2.boxFilter(edited, -1, (box, box), dst=array, borderType=cv2.BORDER_REPLICATE)
+    cv2.boxFilter(array, -1, (box, box), dst=edited, borderType=cv2.BORDER_REPLICATE)
+    pygame.surfarray.blit_array(scaled, edited)
     return pygame.transform.scale_by(scaled, scale)
 
 def scale_surface(surface, target_res, mode : Literal["fill", "fit"]):
@@ -45,7 +52,8 @@ def scale_surface(surface, target_res, mode : Literal["fill", "fit"]):
     elif mode == "fit":
         scale_factor = min(target_res[0] / surface.width, target_res[1] / surface.height)
 
-    scaled = pygame.transform.smoothscale_by(surface, scale_factor)
+    #restoring a window to the size media was loaded at lands here a lot, skip resampling it onto itself
+    scaled = surface if abs(scale_factor - 1) < 1e-6 else pygame.transform.smoothscale_by(surface, scale_factor)
     if mode == "fit":
         return scaled
     
@@ -58,26 +66,43 @@ def scale_surface(surface, target_res, mode : Literal["fill", "fit"]):
     return bg
 
 def smart_colour(surface):
+    """text colour that stands out against surface (its average colour darkened or brightened)
+    \ncached per surface object, the surfaces this gets used on (media frames) never get drawn on after they're loaded"""
+    key = id(surface)
+    if key in _smart_colour_cache:
+        return _smart_colour_cache[key]
+    
     consider_alpha = surface.get_flags() & pygame.SRCALPHA
     r,g,b = pygame.transform.average_color(surface, consider_alpha=consider_alpha)[:3]
-    if 0.2126 * r + 0.7152 * g + 0.0722 * b > 127:
-        smart_colour = np.divide((r,g,b), 2)
-    else:
-        smart_colour = np.multiply((r,g,b), 2)
-    return np.clip(smart_colour, 64, 192).astype(np.uint8)
+    factor = 0.5 if 0.2126 * r + 0.7152 * g + 0.0722 * b > 127 else 2
+    #3 values, plain python beats building and clipping temporary arrays
+    smart_colour = np.array([min(max(int(c * factor), 64), 192) for c in (r,g,b)], dtype=np.uint8)
+
+    if len(_smart_colour_cache) >= SMART_COLOUR_CACHE_SIZE:
+        del _smart_colour_cache[next(iter(_smart_colour_cache))] #oldest
+    _smart_colour_cache[key] = smart_colour
+    weakref.finalize(surface, _smart_colour_cache.pop, key, None) #ids get reused once the surface is gone
+    return smart_colour
 
-def blend(a : pygame.Surface, b : pygame.Surface, strength):
+def blend(a : pygame.Surface, b : pygame.Surface, strength, inplace=False):
+    """blends b over a by strength (0-1)
+    \ninplace: draws straight onto a instead of a copy of it"""
     if a.size != b.size:
         b = pygame.transform.smoothscale(b, a.size)
 
     if strength <= 0:return a
     if strength >= 1:return b
-    a, b = a.copy(), b.copy()
+    if not inplace:
+        a = a.copy()
+    #borrow b's surface alpha for the blit instead of copying b just to change it
+    old_alpha = b.get_alpha()
     b.set_alpha(255*strength)
     a.blit(b, (0,0))
+    b.set_alpha(old_alpha)
     return a
 
 def blend_greyscale(surface, strength):
+    if strength <= 0: return surface #skip converting to greyscale if its not getting used
     return blend(surface, pygame.transform.grayscale(surface), strength)
 
 def coloured_square(colour, size, alpha=None):
@@ -1,17 +1,29 @@
+#tuple() so lists and numpy colours compare the same way, tuple equality runs entirely in C
 def comp_2d(a, b):
-    return a[0] == b[0] and a[1] == b[1]
+    return tuple(a[:2]) == tuple(b[:2])
 
 def comp_3d(a, b):
-    return (a[0] == b[0] and 
-            a[1] == b[1] and
-            a[2] == b[2])
+    return tuple(a[:3]) == tuple(b[:3])
 
 def check_point_in_bounds(tl, pos, br):
     return (tl[0] <= pos[0] <= br[0]
         and tl[1] <= pos[1] <= br[1])
 
 def check_points_in_bounds(points : list[int], tl, br):
-    for point in points:
-        if not check_point_in_bounds(tl, point, br):
-            return False
-    return True
\ No newline at end of file
+    #bounds unpacked once and no call per point
+    x0, y0 = tl
+    x1, y1 = br
+    return all(x0 <= x <= x1 and y0 <= y <= y1 for x, y in points)
+
+#plain tuple maths for 2d sizes/positions, numpy's per call overhead is way bigger than the maths itself for 2 values
+def add_2d(a, b):
+    return (a[0] + b[0], a[1] + b[1])
+
+def sub_2d(a, b):
+    return (a[0] - b[0], a[1] - b[1])
+
+def mul_2d(a, b):
+    return (a[0] * b[0], a[1] * b[1])
+
+def scale_2d(a, scalar):
+    return (a[0] * scalar, a[1] * scalar)
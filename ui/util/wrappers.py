@@ -1,4 +1,5 @@
 from typing import Literal
+from collections import OrderedDict
 
 from PIL import Image, UnidentifiedImageError
 import numpy as np
@@ -8,22 +9,41 @@ import pygame
 import ui.util.exceptions
 import ui.util.graphics
 
+FONT_PATH = "assets/MuseoSans_700.otf"
+FONT_CACHE_SIZE = 32
+_fonts : OrderedDict[tuple[str, int], pygame.Font] = OrderedDict() #(path, scaled size) -> font, the only place fonts are kept alive
+
+def get_font(path, size) -> pygame.Font:
+    """returns the font at path loaded at size, the least recently used are dropped past FONT_CACHE_SIZE 
+    \nnothing else should hold on to the fonts, so dropping them here actually frees them"""
+    key = (path, size)
+    if key in _fonts:
+        _fonts.move_to_end(key)
+    else:
+        _fonts[key] = pygame.Font(path, size)
+        if len(_fonts) > FONT_CACHE_SIZE: #old sizes from previous window sizes
+            _fonts.popitem(last=False)
+    return _fonts[key]
+
 class FontWrapper(dict):
-    """can store the UI font at multiple sizes that get scaled when the screen resizes"""
+    """can store the UI font at multiple sizes that get scaled when the screen resizes
+    \nmaps each size to the size it's scaled to, the fonts themselves come from get_font"""
     def __init__(self, uii):
         self.uii = uii
 
     def __missing__(self, key):
-        scaled_key = round(self.uii.scaler.min(key))
-        self[key] = pygame.Font("assets/MuseoSans_700.otf", scaled_key)
+        self[key] = round(self.uii.scaler.min(key))
         return self[key]
+
+    def scaled_size(self, key) -> int:
+        return super().__getitem__(key)
     
     def __getitem__(self, key) -> pygame.Font:
-        return super().__getitem__(key)
+        return get_font(FONT_PATH, self.scaled_size(key))
     
     def resize(self):
         for key in self.keys():
-            self.__missing__(key)
+            self[key] = round(self.uii.scaler.min(key))
 
 # -----------------------------------------------------------------------------------------
 
@@ -49,8 +69,11 @@ class PicWrapper(MediaWrapper):
         try:
             self.pic = pygame.image.load(path).convert_alpha()
         except pygame.error:
-            img = Image.open(path).convert("RGB")
-            self.pic = pygame.image.frombytes(img.tobytes(), img.size, "RGB")
+            img = Image.open(path)
+            img.draft("RGB", img.size) #lets jpeg decode straight to rgb, no-op for everything else
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            self.pic = pygame.image.frombytes(img.tobytes(), img.size, "RGB").convert()
         self.len = 1
         if self.pic.size[0] * self.pic.size[1] >= int(1024 * 1024 * 1024 // 4 // 3): #pil will not load something like this but pygame will
             raise Image.DecompressionBombError
@@ -59,7 +82,7 @@ class PicWrapper(MediaWrapper):
             self.scaled_pic = ui.util.graphics.scale_surface(self.pic, scale_res, scale_type)
         else:
             self.size = self.pic.size
-            self.scaled_pic = self.pic.copy()
+            self.scaled_pic = self.pic #neither gets drawn on, no need for a copy
 
     def resize(self, scale_res):
         self.scaled_pic = ui.util.graphics.scale_surface(self.pic, scale_res, self.scale_type)
@@ -80,8 +103,9 @@ class VideoWrapper(MediaWrapper):
         self.scale_res = scale_res
         self.media_type = "vid"
         
-        self.fifo = list()
-        self.frames = dict()
+        self.frames : OrderedDict[int, pygame.Surface] = OrderedDict() #lru of decoded frames
+        self.last_decoded = None #where the capture is sitting, reading idx+1 next doesn't need a seek
+        self._rgb_buf : np.ndarray = None #scratch for the bgr -> rgb conversion
         
         self.vid_cap = cv2.VideoCapture(path)
         self.len = int(self.vid_cap.get(cv2.CAP_PROP_FRAME_COUNT)) - 2
@@ -95,11 +119,16 @@ class VideoWrapper(MediaWrapper):
             self.size = self.raw_size
 
         self.max_len = int(10*1024*1024 / (self.size[0] * self.size[1] * 3))
+        self._update_skip()
     
     def resize(self, scale_res):
-        self.fifo = []
-        self.frames = {}
+        self.frames.clear()
         self.size = self.scale_res = scale_res
+        self._update_skip()
+
+    def _update_skip(self):
+        #fast downsampling factor for decoded frames, same for every frame until the next resize
+        self.skip = int(min(self.raw_size[0] / self.size[0], self.raw_size[1] / self.size[1])) if self.scale_type else 1
 
     def __len__(self):
         return self.len
@@ -108,27 +137,32 @@ class VideoWrapper(MediaWrapper):
         if idx > self.len:
             raise KeyError
         if idx in self.frames:
+            self.frames.move_to_end(idx)
             return self.frames[idx]
 
-        if not self.fifo or self.fifo[-1] != idx-1:
+        if self.last_decoded != idx-1:
             self.vid_cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
 
-        self.fifo.append(idx)
-        if len(self.frames) > self.max_len:
-            self.frames.pop(self.fifo.pop(0))
-
         ret, frame = self.vid_cap.read()
+        self.last_decoded = idx if ret else None
         if not ret: raise Exception()
 
         #fast downsampling pass to reduce the work by the smoothscaler later
-        if self.scale_type and (scale_factor := int(np.min(np.divide(self.raw_size, self.size)))) > 1:
-            frame = frame[::scale_factor, ::scale_factor]
-        frame = pygame.surfarray.make_surface(np.rot90(np.fliplr(frame[:, :, ::-1]))).convert()
+        if self.skip > 1:
+            frame = frame[::self.skip, ::self.skip]
+        #cv2 frames are row major bgr, swap the channels in one pass and let pygame read the rows as they are (no rotating/flipping copies)
+        #(into the same buffer every frame, convert() copies out of it straight away)
+        if self._rgb_buf is None or self._rgb_buf.shape != frame.shape:
+            self._rgb_buf = np.empty(frame.shape, dtype=np.uint8)
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        frame = pygame.image.frombuffer(frame, (frame.shape[1], frame.shape[0]), "RGB").convert()
         
         if self.scale_type:
             frame = ui.util.graphics.scale_surface(frame, self.scale_res, self.scale_type)
         
         self.frames[idx] = frame
+        if len(self.frames) > self.max_len:
+            self.frames.popitem(last=False)
         return frame
     
 def wrap_media(path, scale_type : Literal["fit", "fill"]=None, scale_res=None) -> MediaWrapper:
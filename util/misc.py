@@ -1,4 +1,6 @@
 import os
+import ast
+import atexit
 import pygame
 import traceback
 import threading
@@ -14,6 +16,7 @@ class Logging:
     less effort than the logging library"""
     init = False
     lock = threading.Lock()
+    logfile = None #kept open for the whole session instead of reopening it every message
     
     def log(message, print_out=True):
         with Logging.lock:
@@ -25,8 +28,17 @@ class Logging:
                     os.remove("assets/log.txt")
                 except FileNotFoundError:
                     pass
-            with open("assets/log.txt", "a", encoding="UTF-8") as logfile:
-                logfile.write(message + "\n")
+                Logging.logfile = open("assets/log.txt", "a", encoding="UTF-8")
+                atexit.register(Logging.close)
+            if Logging.logfile is None: return #already closed at exit, daemon threads can still log while shutting down
+            Logging.logfile.write(message + "\n")
+            Logging.logfile.flush() #still want everything on disk if the app crashes
+
+    def close():
+        with Logging.lock:
+            if Logging.logfile is not None:
+                Logging.logfile.close()
+                Logging.logfile = None
 
 def log(message : str, print_out=True):
     """alias for Logging.log(message),
@@ -52,7 +64,7 @@ class Settings:
     def verify(self, setting, value):
         """returns value if the value is valid for setting, else the default value of the setting"""
         try:
-            value = eval(value)
+            value = ast.literal_eval(value) #settings are all plain literals, no need to run arbitrary code from the ini
             valid = self.val_tests[setting](value)
         except:
             valid = False